@@ -8,38 +8,51 @@ What this script does (single-file, plug & play):
 - Uses an OpenAI model (configurable via OPENAI_MODEL) to produce a structured ResumeProfile:
   domain weights, skills+levels, overall strength, suggested internship queries.
 - Scrapes LinkedIn + Indeed broadly (Dallas + US-wide) WITHOUT relying on a "remote" keyword.
-- Applies a spaCy-based Dallas/Remote location gate (the ONLY non-LLM filter) **that blocks only clearly out-of-area jobs** while allowing blank/ambiguous/US-wide/remote-like locations through to the LLM.
-- Calls the LLM again (no batching) to evaluate EACH location-approved posting:
+- Drops obviously out-of-scope postings (clearly foreign locations, senior/leadership titles) with a compiled regex sieve before any spaCy or LLM work.
+- Applies a spaCy-based Dallas/Remote location gate **that blocks only clearly out-of-area jobs** while allowing blank/ambiguous/US-wide/remote-like locations through to the LLM.
+- Calls a small, fast model (EVAL_MODEL) to evaluate EACH location-approved posting (several postings packed per call, batches run in parallel on a rate-limited thread pool):
   Approve/Deny to apply, Match Score (0–100), priority, skills matched, gaps, concise reasons.
 - Enforces LLM-only rules: grade/class-year fit, degree level fit, second-language (even "preferred" languages are treated as required).
-- LLM-only hard degree gate (early reject): if a posting explicitly requires a degree the resume doesn’t satisfy, it’s dropped immediately before full evaluation.
+- Hard degree gate (early reject): if a posting explicitly requires a degree the resume doesn’t satisfy, it’s dropped immediately before full evaluation.
+  Clear-cut cases are decided by a local regex classifier; only ambiguous ("preferred"-style) phrasing goes to the LLM gate.
 - Continues scraping additional results until at least 8 final APPROVED internships are found (min. final matches met).
+- Re-scores the top APPROVED candidates with the stronger OPENAI_MODEL for the final ranking.
 - Writes a timestamped CSV of the APPROVED jobs, sorted by LLM match score (highest first).
 - Caches LLM outputs (profile, degree gate decisions, per-job decisions) to avoid re-billing on reruns.
 
 Dependencies:
-  python -m pip install requests beautifulsoup4 lxml spacy PyPDF2 python-docx openai PyMuPDF python-dotenv
+  python -m pip install requests aiohttp aiohttp-retry brotli orjson tiktoken beautifulsoup4 lxml spacy python-docx openai PyMuPDF python-dotenv
   python -m spacy download en_core_web_sm
 
 Environment:
   OPENAI_API_KEY   (required – your OpenAI API key for the live LLM calls)
-  OPENAI_MODEL     (optional – default uses gpt-4)
+  OPENAI_MODEL     (optional – profile + final ranking model, default gpt-4o)
+  OPENAI_EVAL_MODEL (optional – per-posting eval model, default gpt-4o-mini)
 
 Usage:
   python internship_matcher_deep.py [path/to/resume.pdf] [--min-evals 200] [--min-approved 8] [--top 25]
 """
-import os, re, sys, csv, time, json, hashlib, argparse, traceback
+import os, re, sys, csv, time, json, hashlib, argparse, traceback, asyncio, threading, sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from itertools import islice
+from functools import lru_cache, partial
+from urllib.parse import urlparse, parse_qs, urlencode
 from datetime import datetime
 from typing import List, Dict, Any
+import orjson
+import tiktoken
 
 # -------------------- HTTP & scraping deps --------------------
 import requests
+import aiohttp
+from aiohttp_retry import RetryClient, ExponentialRetry
 from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from urllib3.util import Retry
 from requests.adapters import HTTPAdapter
 
 # -------------------- File parsing --------------------
-import PyPDF2
 import fitz  # PyMuPDF
 from docx import Document
 
@@ -54,14 +67,19 @@ except Exception as e:
     sys.exit(1)
 
 # -------------------- spaCy for location gate --------------------
+# The location gate only needs NER (GPE/LOC), so skip the rest of the pipeline.
+# In en_core_web_sm, ner has its own internal tok2vec; the shared one only
+# feeds the (disabled) tagger and parser.
+NLP_DISABLE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+
 try:
     import spacy
     try:
-        NLP = spacy.load("en_core_web_sm")
+        NLP = spacy.load("en_core_web_sm", disable=NLP_DISABLE)
     except Exception:
         from spacy.cli import download
         download("en_core_web_sm")
-        NLP = spacy.load("en_core_web_sm")
+        NLP = spacy.load("en_core_web_sm", disable=NLP_DISABLE)
 except Exception as e:
     print("ERROR: spaCy + en_core_web_sm model are required for initial location filtering.\n"
           "Install with:\n"
@@ -71,13 +89,22 @@ except Exception as e:
     sys.exit(1)
 
 # -------------------- Globals & Config --------------------
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4").strip()
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o").strip()
+RANK_MODEL = OPENAI_MODEL
+EVAL_MODEL = os.getenv("OPENAI_EVAL_MODEL", "gpt-4o-mini").strip()
+RERANK_TOP_K = 25          # approved candidates re-scored with RANK_MODEL
 PROMPT_V = "2025-10-06.v1"
 MIN_EVALS = 200
 MAX_PER_QUERY = 120
 MIN_APPROVED = 8          # ← keep at 8 (only change to the threshold)
-DESCRIPTION_TRIM = None
+DESCRIPTION_TRIM = 800     # max tokens of each job description sent to the LLM (None = no trim)
+LINKEDIN_CONCURRENCY = 8  # LinkedIn 429s quickly; keep this low
+INDEED_CONCURRENCY = 16
+EVAL_WORKERS = 16
+EVAL_BATCH_SIZE = 8       # postings packed into one evaluation call
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))  # account requests-per-minute cap
 CACHE_DIR = ".cache_llm_matcher"
+CACHE_DB = os.path.join(CACHE_DIR, "cache.db")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 client = OpenAI()  # uses OPENAI_API_KEY from environment
@@ -86,23 +113,853 @@ def sha(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8", errors="ignore")).hexdigest()
 
 # ==================== Robust HTTP session with retries ====================
+# Brotli is ~20% smaller than gzip on job-board HTML; only advertise it when
+# the decoder is installed (both requests and aiohttp pick it up automatically).
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+HTTP_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) "
+                   "Chrome/124 Safari/537.36"),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
 def make_session(timeout_sec=12, retries=2, backoff=0.5):
     s = requests.Session()
     retry = Retry(total=retries, backoff_factor=backoff,
-                  status_forcelist=[429, 500, 502, 503, 504],
+                  status_forcelist=RETRY_STATUSES,
                   allowed_methods=frozenset(["GET"]))
     adapter = HTTPAdapter(max_retries=retry)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
-    s.headers.update({
-        "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                       "AppleWebKit/537.36 (KHTML, like Gecko) "
-                       "Chrome/124 Safari/537.36"),
-        "Accept-Language": "en-US,en;q=0.9",
-    })
+    s.headers.update(HTTP_HEADERS)
     s.request_timeout = timeout_sec
     return s
 
 SESSION = make_session()
 
+# ==================== Concurrent fetching (aiohttp) ====================
+# Scraping is I/O-bound: search-result and job-detail pages are fetched
+# concurrently over one keepalive pool instead of one SESSION.get at a time.
+def make_async_session(timeout_sec=12, retries=2, backoff=0.5):
+    # Same 429/5xx retry policy as make_session(), on top of aiohttp.
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=timeout_sec),
+        headers=HTTP_HEADERS,
+    )
+    retry = ExponentialRetry(attempts=retries + 1, start_timeout=backoff,
+                             statuses=set(RETRY_STATUSES))
+    return RetryClient(client_session=session, retry_options=retry)
+
+async def fetch(session, url: str, sem: asyncio.Semaphore = None, **kwargs) -> str:
+    # Returns "" on any network/HTTP/decoding failure so one bad page never sinks a batch.
+    async def _get():
+        try:
+            async with session.get(url, **kwargs) as resp:
+                if resp.status != 200:
+                    return ""
+                return await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, LookupError):
+            return ""
+    if sem is None:
+        return await _get()
+    async with sem:
+        return await _get()
+
+class Fetcher:
+    # One aiohttp session (one keepalive connection pool) for a whole scrape
+    # run. The session lives on a private event loop thread, so the synchronous
+    # scrapers can call fetch_all() as often as they like without reconnecting:
+    #   with Fetcher() as fetcher:
+    #       pages = fetcher.fetch_all(urls, LINKEDIN_CONCURRENCY)
+    def __init__(self, timeout_sec=12, retries=2, backoff=0.5):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        async def _open():
+            return make_async_session(timeout_sec, retries, backoff)
+        self.session = self._run(_open())
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def fetch_all(self, urls: List[str], concurrency: int = LINKEDIN_CONCURRENCY) -> List[str]:
+        # Results line up with `urls`; failed pages come back as "".
+        urls = list(urls)
+        if not urls:
+            return []
+
+        async def _gather():
+            sem = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*[fetch(self.session, u, sem) for u in urls],
+                                        return_exceptions=True)
+        return [r if isinstance(r, str) else "" for r in self._run(_gather())]
+
+    def close(self):
+        try:
+            self._run(self.session.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def fetch_all(urls: List[str], concurrency: int = LINKEDIN_CONCURRENCY) -> List[str]:
+    # One-off convenience; a scrape run should hold a single Fetcher instead.
+    with Fetcher() as fetcher:
+        return fetcher.fetch_all(urls, concurrency)
+
+# ==================== Resume text extraction ====================
+# PyMuPDF (C-backed) is the only PDF parser; .docx via python-docx, .txt as-is.
+RESUME_MAX_PAGES = 5  # longer "resumes" are almost always CVs with appendices
+
+def extract_pdf_text(path: str, max_pages: int = RESUME_MAX_PAGES) -> str:
+    # Pages are loaded one at a time and only up to max_pages, so long PDFs
+    # never have every page parsed into memory.
+    with fitz.open(path) as doc:
+        return "\n".join(doc.load_page(i).get_text("text")
+                         for i in range(min(doc.page_count, max_pages)))
+
+def extract_docx_text(path: str) -> str:
+    return "\n".join(p.text for p in Document(path).paragraphs)
+
+def read_resume_text(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        return extract_pdf_text(path)
+    if ext == ".docx":
+        return extract_docx_text(path)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+# ==================== Posting de-duplication ====================
+# Overlapping queries return the same jobs many times; drop repeats by
+# canonical URL before they cost a location-gate pass or an LLM eval.
+LINKEDIN_JOB_ID_RE = re.compile(r"(\d{6,})$")
+# Dropped when no job id can be extracted; everything else in the query is kept
+# so distinct jobs (e.g. Indeed pagead/clk?ad=...) never collapse into one URL.
+TRACKING_PARAMS = {"refid", "trackingid", "trk", "trkinfo", "position", "pagenum", "from",
+                   "vjs", "tk", "fbclid", "gclid", "lipi", "ebp", "recommendedflavor"}
+
+def canonical_job_url(url: str) -> str:
+    parts = urlparse((url or "").strip())
+    host = re.sub(r"^(www|m)\.", "", parts.netloc.lower())
+    path = parts.path.rstrip("/")
+    qs = parse_qs(parts.query, keep_blank_values=True)
+    job_id = ""
+    if host.endswith("linkedin.com"):
+        host = "linkedin.com"  # uk./de./... country subdomains list the same jobs
+        m = LINKEDIN_JOB_ID_RE.search(path)
+        job_id = m.group(1) if m else (qs.get("currentJobId") or [""])[0]
+        if job_id:
+            path, query = f"/jobs/view/{job_id}", ""
+    elif host.endswith("indeed.com"):
+        # Indeed identifies the job in the query string (viewjob?jk=, rc/clk?jk=, ?vjk=).
+        job_id = (qs.get("jk") or qs.get("vjk") or [""])[0]
+        if job_id:
+            path, query = "/viewjob", urlencode({"jk": job_id})
+    if not job_id:
+        query = urlencode(sorted((k, v) for k, vals in qs.items() for v in vals
+                                 if not k.lower().startswith("utm_")
+                                 and k.lower() not in TRACKING_PARAMS))
+    return parts._replace(scheme="https", netloc=host, path=path, params="",
+                          query=query, fragment="").geturl()
+
+def dedupe_postings(postings, seen_urls: set):
+    # Generator, so it can sit directly between the scrapers and the gates.
+    for p in postings:
+        url = p.get("url")
+        if url:
+            canon = canonical_job_url(url)
+            if canon in seen_urls:
+                continue
+            seen_urls.add(canon)
+        yield p
+
+# ==================== Cheap regex prefilter ====================
+# First stage, before spaCy and the LLM: only rejects the unambiguous cases.
+# Anything it lets through still goes to the spaCy location gate.
+# US namesakes (Paris TX, Dublin OH, Vancouver WA, Warsaw IN, Ontario CA,
+# Amsterdam NY, New Mexico, New England, ...) are left out, and any location
+# that names a US state or the US is never rejected here.
+BAD_LOC_RE = re.compile(
+    r"\b(india|bangalore|bengaluru|hyderabad|pune|chennai|mumbai|new delhi|noida|gurgaon|"
+    r"united kingdom|(?<!new )england|scotland|ireland|germany|munich|france|netherlands|"
+    r"spain|canada|montreal|british columbia|philippines|singapore|shanghai|beijing|"
+    r"japan|tokyo|australia|sydney)\b", re.I)
+# A state code only counts in a bare "City, ST" or before a ZIP / "United
+# States": ", IN" / ", CA" are also the ISO country suffixes the job boards
+# append ("Hyderabad, Telangana, IN").
+US_STATES = (r"(?:A[KLRZ]|C[AOT]|D[CE]|FL|GA|HI|I[ADLN]|K[SY]|LA|M[ADEINOST]|N[CDEHJMVY]|O[HKR]|PA|RI|"
+             r"S[CD]|T[NX]|UT|V[AT]|W[AIVY])")
+US_LOC_RE = re.compile(
+    rf"^[^,]*,\s*{US_STATES}\s*$|,\s*{US_STATES}(?:\s+\d{{5}}\b|,?\s+(?i:united states|usa)\b)"
+    r"|(?i:\b(?:united states|usa)\b)")
+BAD_TITLE_RE = re.compile(r"\b((?<!rising )senior|sr\.?|staff|principal|director|vp|vice president|head of)\b", re.I)
+INTERN_TITLE_RE = re.compile(r"\b(interns?|internships?|co-?op|apprentice(ship)?)\b", re.I)
+
+def passes_prefilter(posting: Dict) -> bool:
+    title = (posting.get("title") or "")[:200]
+    loc = (posting.get("location") or "")[:200]
+    if BAD_LOC_RE.search(loc) and not US_LOC_RE.search(loc):
+        return False
+    # "Senior Software Engineer Intern" is still an internship; only drop
+    # senior/leadership titles that are not internships at all.
+    if BAD_TITLE_RE.search(title) and not INTERN_TITLE_RE.search(title):
+        return False
+    return True
+
+def prefilter(postings: List[Dict]) -> List[Dict]:
+    return [p for p in postings if passes_prefilter(p)]
+
+# ==================== Local degree gate ====================
+# Decides the mechanical cases of the hard degree gate without an LLM call:
+#   "reject"   – a degree above the resume's level is explicitly required
+#   "pass"     – no degree above the resume's level is mentioned, or it is
+#                clearly only preferred / welcome
+#   "escalate" – anything less certain (no clear cue, a negated requirement,
+#                a bare "MS"/"BA" that may be a state or product); let the
+#                LLM degree gate decide
+# Abbreviations are case-sensitive so "ms" / "ba" inside prose don't count.
+DEGREE_RE = re.compile(
+    r"\b(?:(?i:ph\.?\s?d|doctorate|doctoral|master['’]?s|bachelor['’]?s|undergraduate)"
+    r"|M\.?S|MBA|M\.?Eng|B\.?S|B\.?A)\b"
+    r"(?!\.?\s+(?:Office|Excel|Word|PowerPoint|Access|Teams|SQL|Azure|Project|Outlook|"
+    r"Visio|Power|Dynamics|SharePoint|Windows|Exchange))")
+# A bare MS/BS/BA only counts as a degree when it is dotted ("M.S.") or a
+# degree word follows ("MS in", "BS degree").
+ABBREV_DEGREES = {"MS", "BS", "BA", "MEng"}
+DEGREE_WORD_AFTER_RE = re.compile(r"\s*(?:in|degree|program|student|candidate)s?\b", re.I)
+REQ_RE = re.compile(r"\b(required|requires?|must|minimum|currently (?:pursuing|enrolled)|enrolled in)\b", re.I)
+PREF_RE = re.compile(r"\b(preferred|prefer|a plus|nice to have|desired|bonus|welcome|encouraged|eligible)\b", re.I)
+NEG_RE = re.compile(r"\b(not|no|never|without)\b", re.I)
+# Sentence/clause breaks. A period only fails to break after a dotted
+# abbreviation such as "Ph.D." or "M.S."; "CS." / "EE." / "PhD." do break.
+CLAUSE_BREAK_RE = re.compile(r"[.!?;]\s+|\n")
+DOTTED_ABBREV_RE = re.compile(r"(?:\b[A-Za-z]{1,2}\.){2,}$")
+DEGREE_WINDOW = 200
+
+def _clause_span(text: str, start: int, end: int):
+    # The sentence holding the match, capped at DEGREE_WINDOW chars either side,
+    # so an unrelated "required skills" line can't turn a mention into a requirement.
+    def is_break(b):
+        return not (b.group(0)[0] == "." and DOTTED_ABBREV_RE.search(text, 0, b.start() + 1))
+
+    lo, hi = max(0, start - DEGREE_WINDOW), min(len(text), end + DEGREE_WINDOW)
+    for b in CLAUSE_BREAK_RE.finditer(text, lo, start):
+        if is_break(b):
+            lo = b.end()
+    for b in CLAUSE_BREAK_RE.finditer(text, end, hi):
+        if is_break(b):
+            hi = b.start()
+            break
+    return lo, hi
+
+def _nearest_cue(text: str, lo: int, hi: int, start: int, end: int):
+    # The required/preferred cue closest to the degree mention within its clause,
+    # so "Master's required, PhD preferred" reads each degree correctly.
+    cues = [("req", c) for c in REQ_RE.finditer(text, lo, hi)]
+    cues += [("pref", c) for c in PREF_RE.finditer(text, lo, hi)]
+    if not cues:
+        return None, None
+    return min(cues, key=lambda kc: max(kc[1].start() - end, start - kc[1].end(), 0))
+
+def degree_level(text: str):
+    t = (text or "").lower().replace(".", "").replace(" ", "")
+    if t.startswith(("phd", "doctor")):
+        return 3
+    if t.startswith(("master", "ms", "mba", "meng")):
+        return 2
+    if t.startswith(("bachelor", "bs", "ba", "undergrad")):
+        return 1
+    return None
+
+def local_degree_gate(description: str, resume_level):
+    text = description or ""
+    # Degree mentions are grouped by clause: "BS/MS in CS required" or "pursuing
+    # a BS, MS or PhD" lists alternatives, and the lowest one sets the bar.
+    clauses = {}
+    for m in DEGREE_RE.finditer(text):
+        level = degree_level(m.group(0))
+        span = _clause_span(text, m.start(), m.end())
+        if m.group(0) in ABBREV_DEGREES and not DEGREE_WORD_AFTER_RE.match(text, m.end()):
+            # "Jackson, MS", "MS Visio": never makes a clause a requirement on its
+            # own, but still counts as a listed alternative.
+            clauses.setdefault(span, []).append((level, "bare"))
+            continue
+        kind, cue = _nearest_cue(text, span[0], span[1], m.start(), m.end())
+        if kind == "req":
+            neg_lo = max(span[0], min(m.start(), cue.start()) - 20)
+            if NEG_RE.search(text, neg_lo, max(m.end(), cue.end())):
+                kind = "neg"  # "No Master's required", "PhD is not required"
+        clauses.setdefault(span, []).append((level, kind))
+
+    required, unclear = [], []
+    for mentions in clauses.values():
+        levels = [level for level, kind in mentions if kind != "pref"]
+        if not levels:
+            continue
+        if any(kind == "req" for _, kind in mentions):
+            required.append(min(levels))
+        else:
+            unclear.append(min(levels))
+    if not required and not unclear:
+        return "pass", "no degree requirement mentioned"
+    if resume_level is None:
+        return "escalate", "resume degree level unknown"
+    # Never reject while any listed alternative is within the resume's level.
+    if required and min(required) > resume_level:
+        return "reject", f"requires degree level {min(required)}; resume is level {resume_level}"
+    if any(level > resume_level for level in unclear):
+        return "escalate", "higher degree mentioned without a clear requirement"
+    return "pass", "degree requirement satisfied"
+
+# ==================== Location entities (spaCy) ====================
+PLACE_LABELS = frozenset({"GPE", "LOC"})
+
+def extract_places(loc_texts: List[str], batch_size: int = 64) -> List[List[str]]:
+    # One NLP.pipe pass over every posting's location string before the gate
+    # runs, instead of a separate NLP(...) call per posting.
+    return [[ent.text.strip().lower() for ent in doc.ents if ent.label_ in PLACE_LABELS]
+            for doc in NLP.pipe((t or "" for t in loc_texts), batch_size=batch_size, n_process=1)]
+
+# ==================== Search-result card parsing (lxml) ====================
+# Result pages have fixed markup, so cards are pulled with XPath compiled once
+# here instead of building a BeautifulSoup tree per page.
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+LI_CARDS = etree.XPath(f"//div[{_has_class('base-search-card')}]")
+LI_TITLE = etree.XPath(f"string(.//h3[{_has_class('base-search-card__title')}])")
+LI_COMPANY = etree.XPath(f"string(.//h4[{_has_class('base-search-card__subtitle')}])")
+LI_LOCATION = etree.XPath(f"string(.//span[{_has_class('job-search-card__location')}])")
+LI_URL = etree.XPath(f"string(.//a[{_has_class('base-card__full-link')}]/@href)")
+
+IN_CARDS = etree.XPath(f"//div[{_has_class('job_seen_beacon')}]")
+IN_TITLE = etree.XPath("string(.//h2[contains(@class, 'jobTitle')]//span[@title]/@title)")
+IN_COMPANY = etree.XPath("string(.//*[@data-testid='company-name'])")
+IN_LOCATION = etree.XPath("string(.//*[@data-testid='text-location'])")
+IN_JOBKEY = etree.XPath("string(.//a[@data-jk]/@data-jk)")
+
+def _clean(text: str) -> str:
+    return " ".join((text or "").split())
+
+def _parse_html(page: str):
+    if not page or not page.strip():
+        return None
+    try:
+        return lxml_html.fromstring(page)
+    except (etree.ParserError, ValueError):
+        return None
+
+def parse_linkedin_cards(page: str) -> List[Dict]:
+    root = _parse_html(page)
+    if root is None:
+        return []
+    return [{"source": "LinkedIn",
+             "title": _clean(LI_TITLE(card)),
+             "company": _clean(LI_COMPANY(card)),
+             "location": _clean(LI_LOCATION(card)),
+             "url": _clean(LI_URL(card))}
+            for card in LI_CARDS(root)]
+
+def parse_indeed_cards(page: str) -> List[Dict]:
+    root = _parse_html(page)
+    if root is None:
+        return []
+    out = []
+    for card in IN_CARDS(root):
+        jk = _clean(IN_JOBKEY(card))
+        out.append({"source": "Indeed",
+                    "title": _clean(IN_TITLE(card)),
+                    "company": _clean(IN_COMPANY(card)),
+                    "location": _clean(IN_LOCATION(card)),
+                    "url": f"https://www.indeed.com/viewjob?jk={jk}" if jk else ""})
+    return out
+
+# ==================== Rate-limited LLM calls & cache ====================
+class RateLimiter:
+    # Sliding-window limiter shared by every eval worker thread.
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max(1, max_calls)
+        self.period = period
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                delay = self.period - (now - self.calls[0])
+            time.sleep(delay)
+
+LLM_LIMITER = RateLimiter(OPENAI_RPM)
+USAGE_LOCK = threading.Lock()
+USAGE = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+def log_usage(resp):
+    # Tracks how much of each prompt was served from OpenAI's prefix cache.
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    with USAGE_LOCK:
+        USAGE["calls"] += 1
+        USAGE["prompt_tokens"] += usage.prompt_tokens or 0
+        USAGE["cached_tokens"] += cached
+    print(f"[llm] prompt_tokens={usage.prompt_tokens} cached_tokens={cached}")
+
+def usage_summary() -> str:
+    with USAGE_LOCK:
+        total, cached = USAGE["prompt_tokens"], USAGE["cached_tokens"]
+        rate = (100.0 * cached / total) if total else 0.0
+        return f"{USAGE['calls']} LLM calls, {total} prompt tokens, {cached} cached ({rate:.0f}%)"
+
+def chat(**kwargs):
+    LLM_LIMITER.wait()
+    resp = client.chat.completions.create(**kwargs)
+    log_usage(resp)
+    return resp
+
+def chat_stream(**kwargs):
+    # Yields content deltas as they arrive; usage comes on the final chunk.
+    LLM_LIMITER.wait()
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True},
+                                            **kwargs)
+    for chunk in stream:
+        if chunk.usage is not None:
+            log_usage(chunk)
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+# One SQLite file (WAL) instead of a JSON file per entry; each worker thread
+# gets its own connection. Keys embed model + PROMPT_V, so upgrading either
+# simply misses the old rows.
+_CACHE_LOCAL = threading.local()
+
+def cache_conn() -> sqlite3.Connection:
+    conn = getattr(_CACHE_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS llm_cache("
+                     "key TEXT PRIMARY KEY, model TEXT, prompt_v TEXT, response BLOB, ts INTEGER)")
+        _CACHE_LOCAL.conn = conn
+    return conn
+
+def cache_get(key: str):
+    row = cache_conn().execute("SELECT response FROM llm_cache WHERE key=?", (key,)).fetchone()
+    if row is None:
+        return None
+    try:
+        return orjson.loads(row[0])
+    except Exception:
+        return None
+
+def cache_put(key: str, obj: Any, model: str = OPENAI_MODEL):
+    conn = cache_conn()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO llm_cache(key, model, prompt_v, response, ts) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (key, model, PROMPT_V, orjson.dumps(obj), int(time.time())))
+
+def cache_evict(max_age_sec: int):
+    conn = cache_conn()
+    with conn:
+        conn.execute("DELETE FROM llm_cache WHERE ts < ?", (int(time.time()) - max_age_sec,))
+
+# ==================== Batched per-posting evaluation ====================
+# Everything static (rules, rubric, example) lives in this system message and the
+# resume profile follows it verbatim, so every eval call in a run shares the same
+# >=1024-token prefix and hits OpenAI's automatic prompt cache. Only the JOB
+# blocks at the very end vary. Never put timestamps, job ids or PROMPT_V above them.
+EVAL_RULES = """You are an internship-matching assistant. You receive a candidate's resume profile and one or more job postings.
+For EACH posting decide whether the candidate should apply.
+
+HARD RULES (deny if any is violated):
+- Grade / class-year fit: the posting must be open to the candidate's current year or graduation date.
+  Postings for "rising seniors", "graduating in <year>", "final-year students" or "new grads" only fit
+  candidates in exactly that window. Postings that say "all years" or give no constraint fit everyone.
+- Degree level fit: the candidate must satisfy any REQUIRED degree level and field. A posting that
+  requires a Master's or PhD denies a Bachelor's student; "pursuing a BS/MS" accepts either. A required
+  field (e.g. "Computer Science or related") is satisfied by closely related majors listed in the profile.
+- Second language: any non-English language requirement, even "preferred" or "a plus", counts as
+  required. Deny unless the profile lists that language at working proficiency or better.
+- Role type: the posting must be an internship, co-op or student program. Full-time roles that require
+  prior professional experience are denied.
+- Work authorization: if the posting excludes candidates needing sponsorship and the profile says the
+  candidate needs sponsorship, deny.
+
+SCORING RUBRIC (match_score, integer 0-100; only meaningful when approve is true):
+- 90-100: core responsibilities map directly onto the profile's strongest domains and most of the
+  listed required skills appear in the profile at intermediate level or above.
+- 75-89: strong domain overlap; one or two required skills are missing or only at beginner level.
+- 60-74: partial overlap; the candidate could plausibly do the work but would be ramping up on
+  several required skills.
+- 40-59: weak overlap; mostly adjacent skills, the posting's domain carries little weight in the profile.
+- 0-39: little or no overlap.
+Weigh REQUIRED qualifications roughly twice as heavily as PREFERRED ones. Use the profile's domain
+weights to break ties between postings in different domains. Do not reward keyword stuffing: a skill
+counts only if the posting actually asks for it.
+
+PRIORITY:
+- "high": approve is true and match_score >= 80, or the posting is an unusually good fit for the
+  candidate's stated interests.
+- "medium": approve is true and match_score 60-79.
+- "low": everything else.
+
+FIELDS:
+- skills_matched: skills from the posting that the profile demonstrates (short names, max 8).
+- gaps: required or strongly preferred skills/qualifications the profile lacks (max 6).
+- reasons: one or two concise sentences explaining the decision. If a hard rule denied the
+  posting, name the rule first (e.g. "Degree: requires MS; candidate is pursuing BS.").
+
+EXAMPLE
+Profile excerpt: junior, BS Computer Science, Python (advanced), SQL (intermediate), pandas (intermediate).
+### JOB 0
+TITLE: Data Analyst Intern
+LOCATION: Dallas, TX
+DESC: Pursuing a BS in CS, Statistics or related. Python and SQL required; Tableau a plus.
+### JOB 1
+TITLE: Machine Learning Research Intern
+LOCATION: Remote
+DESC: Currently enrolled in a PhD program in ML. Fluency in Japanese preferred.
+Expected output:
+{"decisions": [
+ {"idx": 0, "approve": true, "match_score": 86, "priority": "high", "skills_matched": ["Python", "SQL"],
+  "gaps": ["Tableau"], "reasons": "Required Python and SQL are both strengths; Tableau is only a plus."},
+ {"idx": 1, "approve": false, "match_score": 0, "priority": "low", "skills_matched": [],
+  "gaps": ["PhD enrollment", "Japanese"], "reasons": "Degree: requires PhD enrollment; candidate is pursuing BS."}
+]}
+
+Respond with a single JSON object:
+{"decisions": [{"idx": <job number>, "approve": true|false, "match_score": <int>, "priority": "...",
+  "skills_matched": ["..."], "gaps": ["..."], "reasons": "<one or two concise sentences>"}]}
+Return exactly one decision per job, using the job numbers given."""
+
+# Older snapshots reject response_format={"type": "json_object"}.
+NO_JSON_MODE_MODELS = {"gpt-4", "gpt-4-0613", "gpt-4-0314"}
+
+def json_mode(model: str) -> Dict:
+    return {} if model in NO_JSON_MODE_MODELS else {"response_format": {"type": "json_object"}}
+
+@lru_cache(maxsize=None)
+def token_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def trim_tokens(text: str, n: int) -> str:
+    enc = token_encoding(EVAL_MODEL)
+    ids = enc.encode(text or "", disallowed_special=())
+    return text if len(ids) <= n else enc.decode(ids[:n])
+
+def render_posting(i: int, p: Dict) -> str:
+    # Only the description is trimmed; title/company/location go in whole.
+    desc = p.get("description", "") or ""
+    if DESCRIPTION_TRIM:
+        desc = trim_tokens(desc, DESCRIPTION_TRIM)
+    return (f"### JOB {i}\n"
+            f"TITLE: {p.get('title', '')}\n"
+            f"COMPANY: {p.get('company', '')}\n"
+            f"LOCATION: {p.get('location', '')}\n"
+            f"DESC: {desc}")
+
+def decision_key(profile: Dict, p: Dict, model: str = EVAL_MODEL) -> str:
+    # Per-posting key, so cached decisions survive different batch groupings.
+    payload = orjson.dumps({"profile": profile,
+                            "job": [p.get("title"), p.get("company"), p.get("location"),
+                                    p.get("description"), p.get("url")]},
+                           option=orjson.OPT_SORT_KEYS)
+    return f"eval:{model}:{PROMPT_V}:{hashlib.sha256(payload).hexdigest()}"
+
+def eval_messages(profile: Dict, postings: List[Dict]) -> List[Dict]:
+    jobs = "\n\n".join(render_posting(i, p) for i, p in enumerate(postings))
+    profile_json = orjson.dumps(profile, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    return [
+        {"role": "system", "content": EVAL_RULES},
+        {"role": "user", "content": f"RESUME_PROFILE:\n{profile_json}\n\nJOBS:\n{jobs}"},
+    ]
+
+def decisions_from_json(obj) -> List[Dict]:
+    # Accepts the requested {"decisions": [...]} as well as a bare list of
+    # decisions or a single bare decision object.
+    if isinstance(obj, dict):
+        obj = obj["decisions"] if isinstance(obj.get("decisions"), list) else [obj]
+    return [d for d in obj if isinstance(d, dict)] if isinstance(obj, list) else []
+
+def order_decisions(decisions, n: int) -> List[Dict]:
+    decisions = [d for d in decisions or [] if isinstance(d, dict)]
+    if n == 1 and len(decisions) == 1 and decisions[0].get("idx") is None:
+        decisions[0]["idx"] = 0
+    by_idx = {d.get("idx"): d for d in decisions}
+    if len(decisions) != n or set(by_idx) != set(range(n)):
+        raise ValueError(f"expected {n} decisions, got idx {[d.get('idx') for d in decisions]}")
+    return [by_idx[i] for i in range(n)]
+
+def parse_decisions(text: str, n: int) -> List[Dict]:
+    m = re.search(r"[\[{].*[\]}]", text or "", re.S)
+    return order_decisions(decisions_from_json(orjson.loads(m.group(0) if m else text)), n)
+
+def iter_decision_objects(deltas):
+    # Incremental scan of {"decisions": [{...}, {...}]}: yields each decision
+    # dict as soon as its closing brace streams in. Replies in any other shape
+    # (bare object or list) are parsed whole once the stream ends.
+    depth, in_str, esc, collecting, buf = 0, False, False, False, []
+    raw, found = [], False
+    for delta in deltas:
+        raw.append(delta)
+        for ch in delta:
+            if collecting:
+                buf.append(ch)
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+                continue
+            if ch == '"':
+                in_str = True
+            elif ch in "{[":
+                depth += 1
+                if ch == "{" and depth == 3 and not collecting:
+                    collecting, buf = True, [ch]
+            elif ch in "}]":
+                if ch == "}" and depth == 3 and collecting:
+                    collecting = False
+                    try:
+                        obj = orjson.loads("".join(buf))
+                    except ValueError:
+                        continue
+                    found = True
+                    yield obj
+                depth -= 1
+    if not found:
+        text = "".join(raw)
+        m = re.search(r"[\[{].*[\]}]", text, re.S)
+        try:
+            yield from decisions_from_json(orjson.loads(m.group(0) if m else text))
+        except ValueError:
+            return
+
+def stream_decisions(profile: Dict, postings: List[Dict], model: str = EVAL_MODEL):
+    deltas = chat_stream(model=model, temperature=0,
+                         messages=eval_messages(profile, postings), **json_mode(model))
+    for d in iter_decision_objects(deltas):
+        i = d.get("idx")
+        if isinstance(i, int) and 0 <= i < len(postings):
+            p = postings[i]
+            job = f"{p.get('title', '')} @ {p.get('company', '')}"
+            if model == EVAL_MODEL:
+                verdict = "APPROVED" if d.get("approve") else "denied"
+                print(f"[eval] {verdict} {d.get('match_score', '-')}: {job}")
+            else:
+                print(f"[rerank] {model} score {d.get('match_score', '-')}: {job}")
+        yield d
+
+def _request_decisions(profile: Dict, postings: List[Dict], model: str = EVAL_MODEL) -> List[Dict]:
+    return order_decisions(list(stream_decisions(profile, postings, model)), len(postings))
+
+def _decide_one(profile: Dict, posting: Dict, model: str):
+    try:
+        return _request_decisions(profile, [posting], model)[0]
+    except ValueError as e:
+        print(f"[eval] no usable decision for {posting.get('title', '')} @ "
+              f"{posting.get('company', '')} ({e}); skipping")
+        return None
+
+# A posting whose reply can't be parsed comes back as None (and isn't cached),
+# so one bad LLM reply never aborts the run; callers skip None decisions.
+# Only parse/validation errors (ValueError) are handled here: API and transport
+# errors (openai.APIError: rate limits, auth, connection) propagate after the
+# client's own retries instead of fanning out into per-posting calls.
+def evaluate_batch(profile: Dict, postings: List[Dict], model: str = EVAL_MODEL) -> List[Dict]:
+    keys = [decision_key(profile, p, model) for p in postings]
+    out = [cache_get(k) for k in keys]
+    todo = [i for i, d in enumerate(out) if d is None]
+    if todo:
+        if len(todo) == 1:
+            fresh = [_decide_one(profile, postings[todo[0]], model)]
+        else:
+            try:
+                fresh = _request_decisions(profile, [postings[i] for i in todo], model)
+            except ValueError as e:
+                # Malformed batch output: fall back to one posting per call.
+                print(f"[eval] batch of {len(todo)} failed ({e}); retrying one by one")
+                fresh = [_decide_one(profile, postings[i], model) for i in todo]
+        for i, d in zip(todo, fresh):
+            if d is None:
+                continue
+            d.pop("idx", None)
+            cache_put(keys[i], d, model)
+            out[i] = d
+    return out
+
+# ==================== OpenAI Batch API evaluation (--batch) ====================
+# Latency-tolerant alternative to evaluate_all(): every uncached batch prompt is
+# submitted as one Batch API job (50% token cost, no RPM throttling, results
+# within the 24h window). Chunks that fail or come back malformed are evaluated
+# live, so the result always lines up with `postings`.
+BATCH_POLL_SEC = 30
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+def evaluate_via_batch_api(profile: Dict, postings: List[Dict],
+                           batch_size: int = EVAL_BATCH_SIZE,
+                           poll_sec: int = BATCH_POLL_SEC) -> List[Dict]:
+    keys = [decision_key(profile, p) for p in postings]
+    out = [cache_get(k) for k in keys]
+    todo = [i for i, d in enumerate(out) if d is None]
+    if not todo:
+        return out
+    chunks = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
+    path = os.path.join(CACHE_DIR, "batch_input.jsonl")
+    with open(path, "wb") as f:
+        for n, chunk in enumerate(chunks):
+            body = {"model": EVAL_MODEL, "temperature": 0,
+                    "messages": eval_messages(profile, [postings[i] for i in chunk]),
+                    **json_mode(EVAL_MODEL)}
+            f.write(orjson.dumps({"custom_id": f"chunk-{n}", "method": "POST",
+                                  "url": "/v1/chat/completions", "body": body}) + b"\n")
+    with open(path, "rb") as f:
+        upload = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=upload.id,
+                                  endpoint="/v1/chat/completions",
+                                  completion_window="24h")
+    print(f"[batch] submitted {batch.id}: {len(chunks)} requests for {len(todo)} postings")
+    while batch.status not in BATCH_DONE:
+        time.sleep(poll_sec)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"[batch] {batch.status}: {counts.completed}/{counts.total} done")
+
+    results = {}
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            row = orjson.loads(line)
+            resp = row.get("response") or {}
+            if row.get("error") or resp.get("status_code") != 200:
+                continue
+            results[row["custom_id"]] = resp["body"]["choices"][0]["message"]["content"]
+    print(f"[batch] {batch.status}: {len(results)}/{len(chunks)} requests usable")
+
+    for n, chunk in enumerate(chunks):
+        group = [postings[i] for i in chunk]
+        try:
+            decisions = parse_decisions(results[f"chunk-{n}"], len(chunk))
+        except Exception:
+            out_live = evaluate_batch(profile, group)
+            for i, d in zip(chunk, out_live):
+                out[i] = d
+            continue
+        for i, d in zip(chunk, decisions):
+            d.pop("idx", None)
+            cache_put(keys[i], d, EVAL_MODEL)
+            out[i] = d
+    return out
+
+# ==================== Parallel evaluation ====================
+# Batches are independent network-bound LLM round-trips, so they run on a
+# thread pool. eval_batch(postings) -> decisions (e.g. a partial of
+# evaluate_batch) must do its own degree-gate early reject so rejected
+# postings never reach the full evaluation call. Pairs are yielded as each
+# batch finishes (not in input order), so callers can act on them early; a
+# decision is None when the model gave no usable reply for that posting.
+def evaluate_all(postings: List[Dict], eval_batch, batch_size: int = EVAL_BATCH_SIZE,
+                 max_workers: int = EVAL_WORKERS):
+    batches = [postings[i:i + batch_size] for i in range(0, len(postings), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(eval_batch, b): b for b in batches}
+        for fut in as_completed(futures):
+            yield from zip(futures[fut], fut.result())
+
+# ==================== Final re-ranking with the stronger model ====================
+# The per-posting eval runs on EVAL_MODEL; only the top approved candidates by
+# that score are re-scored with RANK_MODEL to set the final CSV order. The
+# approve/deny verdict stays with the first pass; the cheap score is kept as
+# eval_match_score. When RANK_MODEL denies a posting (or gives no reply), its
+# score/reasons would contradict the APPROVED row, so the first-pass fields stay.
+def rerank_top(profile: Dict, pairs: List[tuple], top_k: int = RERANK_TOP_K) -> List[tuple]:
+    def score(d):
+        try:
+            return float(d.get("match_score") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    approved = sorted((pd for pd in pairs if pd[1] and pd[1].get("approve")),
+                      key=lambda pd: score(pd[1]), reverse=True)
+    head, tail = approved[:top_k], approved[top_k:]
+    if head and RANK_MODEL != EVAL_MODEL:
+        rescore = partial(evaluate_batch, profile, model=RANK_MODEL)
+        rescored = {id(p): d for p, d in evaluate_all([p for p, _ in head], rescore)}
+        merged = []
+        for p, d in head:
+            r = rescored.get(id(p))
+            d = dict(d, eval_match_score=d.get("match_score"))
+            if r and r.get("approve"):
+                for k in ("match_score", "priority", "skills_matched", "gaps", "reasons"):
+                    if k in r:
+                        d[k] = r[k]
+            merged.append((p, d))
+        head = sorted(merged, key=lambda pd: score(pd[1]), reverse=True)
+    return head + tail
+
+# ==================== Scrape -> eval until thresholds are met ====================
+# Pulls postings lazily from a generator (the scrapers), keeps at most
+# max_workers batches in flight, and stops scraping and evaluating as soon as
+# min_approved approvals and min_evals evaluations are both reached.
+def evaluate_until(posting_stream, eval_batch, min_evals: int = MIN_EVALS,
+                   min_approved: int = MIN_APPROVED, batch_size: int = EVAL_BATCH_SIZE,
+                   max_workers: int = EVAL_WORKERS) -> List[tuple]:
+    stream = iter(posting_stream)
+    results, approved, pending = [], 0, {}
+    ex = ThreadPoolExecutor(max_workers=max_workers)
+
+    def refill():
+        while len(pending) < max_workers:
+            batch = list(islice(stream, batch_size))
+            if not batch:
+                return
+            pending[ex.submit(eval_batch, batch)] = batch
+
+    try:
+        refill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                for posting, decision in zip(pending.pop(fut), fut.result()):
+                    results.append((posting, decision))
+                    approved += bool(decision and decision.get("approve"))
+            if approved >= min_approved and len(results) >= min_evals:
+                print(f"[eval] thresholds met ({approved} approved / {len(results)} evaluated); stopping")
+                break
+            refill()
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    return results
+
 # (--- script continues ---)
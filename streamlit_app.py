@@ -11,14 +11,18 @@ st.set_page_config(page_title="Internship Finder", page_icon="🧠", layout="wid
 
 REQUIRED_PKGS = [
     "requests>=2.31",
+    "aiohttp>=3.9",
+    "aiohttp-retry>=2.8",
+    "brotli>=1.1",
+    "orjson>=3.9",
     "beautifulsoup4>=4.12",
     "lxml>=4.9",
     "spacy==3.7.2",
     "en-core-web-sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.7.1/en_core_web_sm-3.7.1-py3-none-any.whl",
-    "PyPDF2>=3.0.1",
     "PyMuPDF==1.24.9",
     "python-docx>=1.1.2",
     "openai>=1.30.0",
+    "tiktoken>=0.7",
     "python-dotenv>=1.0.1",
     "urllib3<2.3",
 ]
@@ -26,13 +30,17 @@ REQUIRED_PKGS = [
 def need_install():
     checks = {
         "requests": "requests",
+        "aiohttp": "aiohttp",
+        "aiohttp_retry": "aiohttp-retry",
+        "brotli": "brotli",
+        "orjson": "orjson",
         "bs4": "beautifulsoup4",
         "lxml": "lxml",
         "spacy": "spacy",
-        "PyPDF2": "PyPDF2",
         "fitz": "PyMuPDF",
         "docx": "python-docx",
         "openai": "openai",
+        "tiktoken": "tiktoken",
     }
     missing = []
     for mod, pkg in checks.items():
@@ -64,6 +72,101 @@ except Exception:
                     "en-core-web-sm @ https://github.com/explosion/spacy-models/releases/download/en_core_web_sm-3.7.1/en_core_web_sm-3.7.1-py3-none-any.whl"],
                    check=False)
 
+SEARCH_TIMEOUT_SEC = 7200  # allow up to two hours for completion
+
+@st.cache_resource
+def search_lock():
+    # One searcher per server: runs share the working directory (result CSVs,
+    # LLM cache), so a second run must not overlap the first.
+    return threading.Lock()
+
+def start_search(cmd):
+    # The searcher runs as its own process; a worker thread collects this
+    # run's output line by line and never touches Streamlit. (It stays a
+    # subprocess, cold start included, until internship_matcher_deep grows a
+    # main() that an in-process run() could wrap.) The run lives in
+    # st.session_state, so widget reruns re-attach to it instead of losing it.
+    lock = search_lock()
+    if not lock.acquire(blocking=False):
+        return None
+    search = {"lines": [], "outcome": {}, "started": time.time()}
+
+    def work():
+        deadline = None
+        try:
+            proc = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            )
+            # Enforced here, not in the UI loop, so a closed tab can't leave the
+            # child running and the lock held forever.
+            deadline = threading.Timer(SEARCH_TIMEOUT_SEC, proc.kill)
+            deadline.daemon = True
+            deadline.start()
+            for line in proc.stdout:
+                search["lines"].append(line)
+            search["outcome"]["returncode"] = proc.wait()
+        except Exception as e:
+            search["outcome"]["error"] = e
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+            lock.release()
+
+    search["worker"] = threading.Thread(target=work, daemon=True)
+    search["worker"].start()
+    return search
+
+def show_search(search):
+    # Runs on the script thread and owns every UI update, in place, once a second.
+    lines, outcome, started = search["lines"], search["outcome"], search["started"]
+    worker = search["worker"]
+    status = st.status("Running the internship searcher... this may take up to an hour ⏳",
+                       expanded=worker.is_alive())
+    elapsed_box = status.empty()
+    log_box = status.empty()
+    while worker.is_alive():
+        elapsed = int(time.time() - started)
+        elapsed_box.markdown(f"🫀 Still working… {elapsed}s elapsed")
+        log_box.code("".join(lines)[-3000:] or "Starting…")
+        worker.join(timeout=1)
+    elapsed_box.empty()
+    log_box.empty()
+
+    st.text_area(
+        "Console Output",
+        "".join(lines),
+        height=300,
+    )
+
+    if "error" in outcome or outcome.get("returncode"):
+        status.update(label="Searcher failed", state="error", expanded=False)
+        detail = outcome.get("error") or f"exit code {outcome.get('returncode')}"
+        st.error(f"Error running script: {detail}")
+        return
+    search.setdefault("finished", time.time())
+    status.update(label=f"Finished in {int(search['finished'] - started)}s", state="complete",
+                  expanded=False)
+
+    # Locate the CSV this run wrote (newest result file since it started)
+    csv_files = [
+        f
+        for f in os.listdir(".")
+        if f.startswith("internship_results_") and f.endswith(".csv")
+        and os.path.getmtime(f) >= started
+    ]
+    latest_csv = max(csv_files, key=os.path.getmtime) if csv_files else None
+    if latest_csv:
+        with open(latest_csv, "rb") as f:
+            st.download_button(
+                "📥 Download Results CSV",
+                f,
+                file_name=os.path.basename(latest_csv),
+                mime="text/csv",
+            )
+    else:
+        st.warning("No CSV file found. Check logs above for issues.")
+
 st.title("🎯 Internship Finder (AI-Driven)")
 st.write(
     "Upload your resume, and this app will find and rank matching internships "
@@ -84,19 +187,9 @@ if uploaded_file is not None:
     min_approved = st.number_input("Minimum approved matches", 1, 50, 1, step=1)
     top_n = st.number_input("Show top N results", 1, 50, 5, step=1)
 
-    if st.button("🚀 Run Searcher"):
-        st.info("Running the internship searcher... this may take up to an hour ⏳")
-
-        # ---------------- Heartbeat thread ----------------
-        stop_flag = False
-        def heartbeat():
-            while not stop_flag:
-                st.write("🫀 Still working... please wait...")
-                time.sleep(60)  # every 60 seconds keeps Streamlit alive
-        hb_thread = threading.Thread(target=heartbeat)
-        hb_thread.start()
-        # --------------------------------------------------
-
+    search = st.session_state.get("search_run")
+    in_flight = search is not None and search["worker"].is_alive()
+    if st.button("🚀 Run Searcher", disabled=in_flight):
         cmd = [
             sys.executable if sys.executable else "python3",
             "internship_matcher_deep.py",
@@ -105,41 +198,14 @@ if uploaded_file is not None:
             f"--min-approved={int(min_approved)}",
             f"--top={int(top_n)}",
         ]
-
-        try:
-            # allow up to two hours for completion
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=7200)
-
-            stop_flag = True
-            hb_thread.join()
-
-            st.text_area(
-                "Console Output",
-                result.stdout + "\n" + result.stderr,
-                height=300,
-            )
-
-            # Locate the most recent CSV result file
-            csv_files = [
-                f
-                for f in os.listdir(".")
-                if f.startswith("internship_results_") and f.endswith(".csv")
-            ]
-            if csv_files:
-                latest_csv = max(csv_files, key=os.path.getmtime)
-                with open(latest_csv, "rb") as f:
-                    st.download_button(
-                        "📥 Download Results CSV",
-                        f,
-                        file_name=latest_csv,
-                        mime="text/csv",
-                    )
-            else:
-                st.warning("No CSV file found. Check logs above for issues.")
-        except Exception as e:
-            stop_flag = True
-            hb_thread.join()
-            st.error(f"Error running script: {e}")
+        search = start_search(cmd)
+        if search is None:
+            st.warning("Another search is already running on this server. Please try again once it finishes.")
+        else:
+            st.session_state["search_run"] = search
+
+    if st.session_state.get("search_run") is not None:
+        show_search(st.session_state["search_run"])
 
 else:
     st.info("Please upload your resume to begin.")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The module refuses to import without a key; tests never make live calls.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
@@ -0,0 +1,64 @@
+import pytest
+
+imd = pytest.importorskip("internship_matcher_deep")
+
+
+def chunks(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("reply", [
+    '{"decisions": [{"idx": 0, "approve": true}, {"idx": 1, "approve": false}]}',
+    '[{"idx": 0, "approve": true}, {"idx": 1, "approve": false}]',
+    '```json\n{"decisions": [{"idx": 1, "approve": false}, {"idx": 0, "approve": true}]}\n```',
+])
+def test_streamed_reply_shapes(reply):
+    decisions = imd.order_decisions(list(imd.iter_decision_objects(chunks(reply))), 2)
+    assert [d["approve"] for d in decisions] == [True, False]
+
+
+def test_large_batch_keeps_numeric_order():
+    n = 12
+    decisions = [{"idx": i, "match_score": i} for i in reversed(range(n))]
+    assert [d["match_score"] for d in imd.order_decisions(decisions, n)] == list(range(n))
+
+
+def test_duplicate_idx_is_rejected():
+    with pytest.raises(ValueError):
+        imd.order_decisions([{"idx": 0}, {"idx": 1}, {"idx": 1}], 2)
+
+
+def test_bare_single_decision_without_idx():
+    decisions = list(imd.iter_decision_objects(chunks('{"approve": false, "match_score": 0}')))
+    assert imd.order_decisions(decisions, 1)[0]["approve"] is False
+
+
+def test_unusable_reply_raises_for_batch_fallback():
+    with pytest.raises(ValueError):
+        imd.order_decisions(list(imd.iter_decision_objects(chunks("I can't help with that."))), 2)
+
+
+def test_bad_single_reply_records_none(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("malformed")
+
+    monkeypatch.setattr(imd, "_request_decisions", broken)
+    monkeypatch.setattr(imd, "cache_get", lambda key: None)
+    monkeypatch.setattr(imd, "cache_put", lambda *a, **k: None)
+    postings = [{"title": "Data Intern"}, {"title": "SWE Intern"}]
+    assert imd.evaluate_batch({}, postings) == [None, None]
+    assert imd.evaluate_batch({}, postings[:1]) == [None]
+
+
+def test_api_errors_are_not_fanned_out(monkeypatch):
+    calls = []
+
+    def throttled(profile, postings, model):
+        calls.append(len(postings))
+        raise RuntimeError("429 rate limited")
+
+    monkeypatch.setattr(imd, "_request_decisions", throttled)
+    monkeypatch.setattr(imd, "cache_get", lambda key: None)
+    with pytest.raises(RuntimeError):
+        imd.evaluate_batch({}, [{"title": "Data Intern"}, {"title": "SWE Intern"}])
+    assert calls == [2]
@@ -0,0 +1,35 @@
+import pytest
+
+imd = pytest.importorskip("internship_matcher_deep")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://www.linkedin.com/jobs/view/software-intern-at-acme-3812345678?refId=x&trackingId=y",
+     "https://uk.linkedin.com/jobs/view/3812345678/"),
+    ("https://www.linkedin.com/jobs/search/?currentJobId=3812345678&keywords=intern",
+     "https://linkedin.com/jobs/view/3812345678"),
+    ("https://www.indeed.com/rc/clk?jk=abc123&vjs=3",
+     "https://indeed.com/viewjob?jk=abc123&from=serp#frag"),
+    ("https://careers.acme.com/jobs?id=42&utm_source=li",
+     "https://careers.acme.com/jobs?id=42"),
+])
+def test_same_job_same_url(a, b):
+    assert imd.canonical_job_url(a) == imd.canonical_job_url(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("https://www.indeed.com/pagead/clk?mo=r&ad=AAA", "https://www.indeed.com/pagead/clk?mo=r&ad=BBB"),
+    ("https://www.linkedin.com/jobs/search/?currentJobId=3912345678",
+     "https://www.linkedin.com/jobs/search/?currentJobId=3999999999"),
+    ("https://careers.acme.com/jobs?id=42", "https://careers.acme.com/jobs?id=43"),
+])
+def test_distinct_jobs_stay_distinct(a, b):
+    assert imd.canonical_job_url(a) != imd.canonical_job_url(b)
+
+
+def test_dedupe_postings_drops_repeats():
+    seen = set()
+    postings = [{"url": "https://www.indeed.com/rc/clk?jk=abc"},
+                {"url": "https://indeed.com/viewjob?jk=abc"},
+                {"title": "no url"}]
+    assert len(list(imd.dedupe_postings(postings, seen))) == 2
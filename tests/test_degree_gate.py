@@ -0,0 +1,53 @@
+import pytest
+
+imd = pytest.importorskip("internship_matcher_deep")
+
+BACHELOR, MASTER = 1, 2
+
+
+@pytest.mark.parametrize("desc", [
+    "PhD in Machine Learning required.",
+    "Must be enrolled in a Ph.D. program.",
+    "Minimum qualifications: Master's degree in CS or related field.",
+    "Must hold an M.S. in Statistics.",
+    "MS degree required.",
+    "Master's degree required, PhD preferred.",
+    "Master’s degree required.",
+])
+def test_explicit_higher_requirement_rejects(desc):
+    assert imd.local_degree_gate(desc, BACHELOR)[0] == "reject"
+
+
+@pytest.mark.parametrize("desc", [
+    "Currently pursuing a Bachelor's or Master's degree in CS.",
+    "MS in Statistics preferred. BS required.",
+    "Experience with MS Excel required.",
+    "Proficiency in MS Outlook and MS Visio required.",
+    "Must be proficient in MS Power BI.",
+    "BS/MS in Computer Science required.",
+    "Pursuing a BS or MS in CS required.",
+    "Minimum Qualifications\nCurrently pursuing a BS, MS or PhD in CS.",
+    "Pursuing a degree in CS or EE. PhD students are also welcome and must submit a transcript.",
+    "No experience needed.",
+])
+def test_satisfied_or_unrelated_passes(desc):
+    assert imd.local_degree_gate(desc, BACHELOR)[0] == "pass"
+
+
+@pytest.mark.parametrize("desc", [
+    "No Master's degree required.",
+    "A PhD is not required for this role.",
+    "Located in Jackson, MS. Must be enrolled in an undergraduate program.",
+    "Master's degree students are a great fit.",
+    "Candidates with an M.S. will stand out; required skills: Python.",
+])
+def test_ambiguous_phrasing_escalates(desc):
+    assert imd.local_degree_gate(desc, BACHELOR)[0] == "escalate"
+
+
+def test_preferred_higher_degree_passes_when_requirement_met():
+    assert imd.local_degree_gate("Master's degree required, PhD preferred.", MASTER)[0] == "pass"
+
+
+def test_unknown_resume_level_escalates():
+    assert imd.local_degree_gate("PhD required.", None)[0] == "escalate"
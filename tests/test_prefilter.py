@@ -0,0 +1,29 @@
+import pytest
+
+imd = pytest.importorskip("internship_matcher_deep")
+
+
+@pytest.mark.parametrize("title, location", [
+    ("Senior Internal Auditor", "Dallas, TX"),
+    ("Senior International Tax Manager", "Dallas, TX"),
+    ("Director, Internet Marketing", "Remote"),
+    ("Data Intern", "Bengaluru, India"),
+    ("Data Intern", "London, England"),
+    ("Data Intern", "Toronto, ON, Canada"),
+    ("Data Intern", "Hyderabad, Telangana, IN"),
+])
+def test_rejects_clearly_out_of_scope(title, location):
+    assert not imd.passes_prefilter({"title": title, "location": location})
+
+
+@pytest.mark.parametrize("title, location", [
+    ("Senior Software Engineer Intern", "Dallas, TX"),
+    ("Software Intern - Rising Senior", "Remote"),
+    ("Data Intern", "Warsaw, IN"),
+    ("Data Intern", "Ontario, CA"),
+    ("Data Intern", "Remote - New England"),
+    ("Co-op Student", "Paris, TX"),
+    ("Data Intern", "Warsaw, IN 46580"),
+])
+def test_keeps_internships_and_us_namesakes(title, location):
+    assert imd.passes_prefilter({"title": title, "location": location})